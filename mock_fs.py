@@ -12,17 +12,85 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import functools
+import io
+import mmap
 import os
 import typing
 from io import BytesIO, StringIO
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 
+_MISSING = object()
+
+
+class _VersionCell:
+    """Shared mutation counter for the nodes of one filesystem.
+
+    Every Directory in a tree holds the same cell, so mutations made directly
+    on a node handle bump the same counter the resolve cache validates
+    against, not just mutations made through MockFilesystem methods.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+
+def _join(parent: str, name: str) -> str:
+    return parent + name if parent.endswith('/') else parent + '/' + name
+
+
+def _parent_and_name(path: typing.Union[str, Path]) -> typing.Tuple[str, str]:
+    # str.rpartition gives the parent and final component without paying for a
+    # PurePath allocation; Path input falls back to the pathlib accessors.
+    if isinstance(path, str):
+        # PurePath ignores trailing slashes ('/name/' names '/name'); strip
+        # them so str arguments keep agreeing, leaving bare '/' alone.
+        if path.endswith('/') and len(path) > 1:
+            path = path.rstrip('/') or '/'
+        parent, _, name = path.rpartition('/')
+        return parent or '/', name
+    return str(path.parent), path.name
+
+
+@functools.lru_cache(maxsize=4096)
+def _split_path(path: str) -> typing.Tuple[str, ...]:
+    # Tokenizing via str.split avoids constructing a PurePath (and re-parsing the
+    # string) on every lookup; the cache makes repeated lookups of hot paths free.
+    # Dropping empty tokens (leading/doubled slashes) and '.' segments keeps
+    # parity with PurePath's normalization of the same string.
+    return tuple(p for p in path.split('/') if p and p != '.')
+
 
 class MockFilesystem:
+    __slots__ = ('_root', '_resolve_cache', '_version_cell')
+
+    # Bound on the number of resolved paths remembered between mutations.
+    RESOLVE_CACHE_SIZE = 1024
 
     def __init__(self):
-        self.root = Directory(Path('/'))
+        # The tree is a trie keyed on path segments: each Directory maps one
+        # child name to its node, so any lookup is O(depth) dict hits rather
+        # than a scan over all stored paths.  The root node itself is created
+        # lazily; read-only operations on an empty filesystem never need it.
+        self._root = None
+        # Shortcut cache mapping full path strings to already-resolved nodes, so
+        # hot paths skip the root-anchored walk.  Entries are tagged with the
+        # filesystem version at insert time; any mutation bumps the version,
+        # implicitly invalidating everything cached before it.
+        self._resolve_cache: typing.MutableMapping[
+            str, typing.Tuple[int, typing.Union['Directory', 'File']]] = \
+            collections.OrderedDict()
+        self._version_cell = _VersionCell()
+
+    @property
+    def root(self) -> 'Directory':
+        if self._root is None:
+            self._root = Directory('/')
+            self._root._version_cell = self._version_cell
+        return self._root
 
     def create_dir(
             self,
@@ -37,26 +105,26 @@ class MockFilesystem:
         if not path.startswith('/'):
             raise ValueError('Path must start with slash')
         current_dir = self.root
-        tokens = Path(path).parts[1:]
+        tokens = _split_path(path)
         for token in tokens[:-1]:
-            if token in current_dir:
-                current_dir = current_dir[token]
+            child = current_dir._children.get(token, _MISSING)
+            if child is not _MISSING:
+                current_dir = child
+            elif make_parents:
+                current_dir = current_dir.create_dir(
+                    token,
+                    permissions=permissions,
+                    user_id=user_id,
+                    user=user,
+                    group_id=group_id,
+                    group=group)
             else:
-                if make_parents:
-                    current_dir = current_dir.create_dir(
-                        token,
-                        permissions=permissions,
-                        user_id=user_id,
-                        user=user,
-                        group_id=group_id,
-                        group=group)
-                else:
-                    raise FileNotFoundError(str(current_dir.path / token))
+                raise FileNotFoundError(_join(current_dir._path_str, token))
 
         # Current backend will always raise an error if the final directory component
         # already exists.
         token = tokens[-1]
-        if token not in current_dir:
+        if current_dir._children.get(token, _MISSING) is _MISSING:
             current_dir = current_dir.create_dir(
                 token,
                 permissions=permissions,
@@ -65,9 +133,35 @@ class MockFilesystem:
                 group_id=group_id,
                 group=group)
         else:
-            raise FileExistsError(str(current_dir.path / token))
+            raise FileExistsError(_join(current_dir._path_str, token))
         return current_dir
 
+    def create_dirs(
+            self,
+            paths: typing.Iterable[str],
+            make_parents: bool = False,
+            permissions: typing.Optional[int] = None,
+            user_id: typing.Optional[int] = None,
+            user: typing.Optional[str] = None,
+            group_id: typing.Optional[int] = None,
+            group: typing.Optional[str] = None,
+    ) -> typing.List['Directory']:
+        """Create several directories in one call, in the order given.
+
+        Equivalent to calling create_dir for each path with the same keyword
+        arguments; exists so fixture code can declare its tree in one place.
+        """
+        return [
+            self.create_dir(
+                path,
+                make_parents=make_parents,
+                permissions=permissions,
+                user_id=user_id,
+                user=user,
+                group_id=group_id,
+                group=group)
+            for path in paths]
+
     def create_file(
             self,
             path: typing.Union[str, Path],
@@ -78,10 +172,10 @@ class MockFilesystem:
             group_id: typing.Optional[int] = None,
             group: typing.Optional[str] = None,
     ) -> 'File':
-        path = Path(path)
-        dir_ = self[path.parent]
+        parent, name = _parent_and_name(path)
+        dir_ = self[parent]
         return dir_.create_file(
-            path.name,
+            name,
             data,
             permissions=permissions,
             user_id=user_id,
@@ -89,76 +183,177 @@ class MockFilesystem:
             group_id=group_id,
             group=group)
 
+    def create_files(
+            self,
+            items: typing.Iterable[typing.Tuple[
+                typing.Union[str, Path],
+                typing.Union[bytes, str, typing.BinaryIO, typing.TextIO]]],
+    ) -> typing.List['File']:
+        """Create many files at once, resolving each parent directory only once.
+
+        ``items`` is an iterable of (path, data) pairs.  Files sharing a parent
+        are grouped so the parent walk happens per directory rather than per
+        file.  All parent directories must already exist.
+        """
+        by_parent: typing.Dict[str, typing.List[typing.Tuple[str, typing.Any]]] = {}
+        for path, data in items:
+            parent, name = _parent_and_name(path)
+            by_parent.setdefault(parent, []).append((name, data))
+        created = []
+        for parent, children in by_parent.items():
+            dir_ = self[parent]
+            for name, data in children:
+                created.append(dir_.create_file(name, data))
+        return created
+
     def list_dir(self, path) -> typing.List[str]:
-        current_dir = self.root
-        tokens = Path(path).parts[1:]
-        for token in tokens:
-            try:
-                current_dir = current_dir[token]
-            except KeyError:
-                raise FileNotFoundError(str(current_dir.path / token))
+        path_str = path if isinstance(path, str) else str(path)
+        if path_str == '/' or path_str == '':
+            # Root needs no tokenization or walk at all.
+            if self._root is None:
+                return []
+            current_dir = self._root
+        else:
+            current_dir = self._resolve(path_str)
+        # Exact-type check accepts the overwhelmingly common case in one
+        # comparison; the slower isinstance checks only run to pick the error.
+        if type(current_dir) is not Directory:
             if isinstance(current_dir, File):
-                raise NotADirectoryError(str(current_dir.path))
+                raise NotADirectoryError(current_dir._path_str)
             if not isinstance(current_dir, Directory):
-                # For now, ignoring other possible cases besides File and Directory (e.g. Symlink).
+                # For now, ignoring other possible cases besides File and Directory
+                # (e.g. Symlink).
                 raise NotImplementedError()
 
-        return [str(child.path) for child in current_dir]
+        prefix = current_dir._path_str
+        if not prefix.endswith('/'):
+            prefix += '/'
+        return [prefix + name for name in current_dir.names()]
 
     def open(
             self,
             path: typing.Union[str, Path],
             encoding: typing.Optional[str] = 'utf-8',
     ) -> typing.Union[typing.BinaryIO, typing.TextIO]:
-        path = Path(path)
         file = self[path]  # warning: no check re: directories
         if isinstance(file, Directory):
-            raise IsADirectoryError(str(file.path))
+            raise IsADirectoryError(file._path_str)
         return file.open(encoding=encoding)
 
+    def open_dir(self, path: typing.Union[str, Path]) -> 'Directory':
+        """Return the Directory at ``path`` as a handle for direct operations.
+
+        Callers that create many entries under one parent can resolve it once
+        and call create_file/create_dir on the handle directly, skipping the
+        per-call path parse and root-anchored walk.  Mutations made through
+        the handle are immediately visible to path-based lookups; the handle
+        itself only goes stale if the directory (or an ancestor) is deleted
+        from the filesystem, after which writes to it are silently lost.
+        """
+        dir_ = self._resolve(path if isinstance(path, str) else str(path))
+        if not isinstance(dir_, Directory):
+            raise NotADirectoryError(dir_._path_str)
+        return dir_
+
+    def __contains__(self, path: typing.Union[str, Path]) -> bool:
+        # Existence check via a plain walk; unlike __getitem__ this never
+        # raises, so probing for absent paths costs no exception machinery.
+        path_str = path if isinstance(path, str) else str(path)
+        cached = self._resolve_cache.get(path_str)
+        if cached is not None and cached[0] == self._version_cell.value:
+            return True
+        tokens = _split_path(path_str)
+        current = self._root
+        if current is None:
+            return not tokens
+        for token in tokens:
+            if not isinstance(current, Directory):
+                return False
+            current = current._children.get(token)
+            if current is None:
+                return False
+        return True
+
     def __getitem__(self, path: typing.Union[str, Path]) -> typing.Union['Directory', 'File']:
-        path = Path(path)
-        tokens = path.parts[1:]
+        return self._resolve(path if isinstance(path, str) else str(path))
+
+    def __delitem__(self, path: typing.Union[str, Path]) -> None:
+        parent, name = _parent_and_name(path)
+        parent_dir: Directory = self[parent]
+        del parent_dir[name]
+
+    def _resolve(self, path: str) -> typing.Union['Directory', 'File']:
+        cached = self._resolve_cache.get(path)
+        if cached is not None:
+            version, node = cached
+            if version == self._version_cell.value:
+                self._resolve_cache.move_to_end(path)
+                return node
+            del self._resolve_cache[path]
+        tokens = _split_path(path)
+        if self._root is None and tokens:
+            # Nothing exists yet; fail without materializing the root.
+            raise FileNotFoundError('/' + tokens[0])
         current_object = self.root
         for token in tokens:
-            # ASSUMPTION / TESTME: object might be file
-            if token in current_object:
-                current_object = current_object[token]
-            else:
-                raise FileNotFoundError(str(current_object.path / token))
+            if not isinstance(current_object, Directory):
+                raise NotADirectoryError(current_object._path_str)
+            # A single direct dict.get per step: one hash, no second lookup on
+            # hit, no exception machinery on miss, and no Directory method
+            # frame in between.
+            child = current_object._children.get(token, _MISSING)
+            if child is _MISSING:
+                raise FileNotFoundError(_join(current_object._path_str, token))
+            current_object = child
+        self._resolve_cache[path] = (self._version_cell.value, current_object)
+        if len(self._resolve_cache) > self.RESOLVE_CACHE_SIZE:
+            self._resolve_cache.popitem(last=False)
         return current_object
 
-    def __delitem__(self, path: typing.Union[str, Path]) -> None:
-        parent_dir: Directory = self[path.parent]
-        del parent_dir[path.name]
-
 
 class Directory:
+    # Nodes are instantiated once per filesystem entry; __slots__ keeps the
+    # per-instance footprint down and avoids a __dict__ lookup per attribute.
+    __slots__ = ('_path_str', '_children', '_version_cell', 'permissions', 'user', 'user_id',
+                 'group', 'group_id')
+
     def __init__(
             self,
-            path: Path,
+            path: typing.Union[str, Path],
             permissions: typing.Optional[int] = None,
             user_id: typing.Optional[int] = None,
             user: typing.Optional[str] = None,
             group_id: typing.Optional[int] = None,
             group: typing.Optional[str] = None):
-        self.path = path
+        # Paths are stored as plain strings; a str is far cheaper to create and
+        # hold than a PurePath, and most operations only ever need the string.
+        self._path_str = path if isinstance(path, str) else str(path)
         self._children: typing.Dict[str, typing.Union[Directory, File]] = {}
+        # Replaced with the tree-wide cell when the node is attached to a
+        # parent (or to a MockFilesystem root).
+        self._version_cell = _VersionCell()
         self.permissions = permissions
         self.user = user
         self.user_id = user_id
         self.group = group
         self.group_id = group_id
 
+    @property
+    def path(self) -> Path:
+        return Path(self._path_str)
+
     @property
     def name(self) -> str:
-        return self.path.name
+        return self._path_str.rsplit('/', 1)[-1]
 
     def __contains__(self, child: str) -> bool:
         return child in self._children
 
     def __iter__(self) -> typing.Iterator[typing.Union['File', 'Directory']]:
-        return (value for value in self._children.values())
+        return iter(self._children.values())
+
+    def names(self) -> typing.KeysView[str]:
+        return self._children.keys()
 
     def __getitem__(self, key: str) -> typing.Union['File', 'Directory']:
         return self._children[key]
@@ -167,7 +362,8 @@ class Directory:
         try:
             del self._children[key]
         except KeyError:
-            raise FileNotFoundError(str(self.path / key))
+            raise FileNotFoundError(_join(self._path_str, key))
+        self._version_cell.value += 1
 
     def create_dir(
             self,
@@ -178,14 +374,17 @@ class Directory:
             group_id: typing.Optional[int] = None,
             group: typing.Optional[str] = None,
     ) -> 'Directory':
-        self._children[name] = Directory(
-            self.path / name,
+        child = Directory(
+            _join(self._path_str, name),
             permissions=permissions,
             user_id=user_id,
             user=user,
             group_id=group_id,
             group=group)
-        return self._children[name]
+        child._version_cell = self._version_cell
+        self._children[name] = child
+        self._version_cell.value += 1
+        return child
 
     def create_file(
             self,
@@ -198,92 +397,224 @@ class Directory:
             group: typing.Optional[str] = None,
     ) -> 'File':
         self._children[name] = File(
-            self.path / name,
+            _join(self._path_str, name),
             data,
             permissions=permissions,
             user_id=user_id,
             user=user,
             group_id=group_id,
             group=group)
+        self._version_cell.value += 1
         return self._children[name]
 
 
+class _MemReader(io.RawIOBase):
+    """Read-only raw stream over an in-memory bytes object, without copying it.
+
+    BytesIO(data) copies the whole payload into a fresh mutable buffer on every
+    open(); reading through a memoryview instead shares the original storage.
+    """
+    __slots__ = ('_buf', '_pos')
+
+    def __init__(self, data):
+        self._buf = memoryview(data).toreadonly()
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
 class File:
+    __slots__ = ('_path_str', 'data', '_kind', '_mm', '_decoded', 'permissions', 'user',
+                 'user_id', 'group', 'group_id')
+
     MAX_MEM_LENGTH = 102400
     READ_BLOCK_SIZE = 102400
 
+    # Storage kind tags; checked instead of repeated isinstance/hasattr probes.
+    _BYTES = 0
+    _STR = 1
+    _TEMP = 2
+
     def __init__(
             self,
-            path: Path,
+            path: typing.Union[str, Path],
             data: typing.Union[str, bytes, StringIO, BytesIO],
             permissions: typing.Optional[int] = None,
             user_id: typing.Optional[int] = None,
             user: typing.Optional[str] = None,
             group_id: typing.Optional[int] = None,
             group: typing.Optional[str] = None):
-        self.path = path
-        if isinstance(data, (StringIO, BytesIO)):
-            data = self._get_data_from_filelike_object(data)
-        else:
+        self._path_str = path if isinstance(path, str) else str(path)
+        if isinstance(data, bytes):
+            # Fast path: bytes are already in their final form; no conversion
+            # checks needed, only the spill-to-tempfile decision.
+            kind = File._BYTES
+            if len(data) > File.MAX_MEM_LENGTH:
+                data = self._spill_to_tempfile(data)
+                kind = File._TEMP
+        elif isinstance(data, str):
+            kind = File._STR
             # Farm out to file if too large
             if len(data) > File.MAX_MEM_LENGTH:
-                tf = NamedTemporaryFile(delete=False)
-                with tf:
-                    if isinstance(data, str):
-                        data = data.encode()
-                    tf.write(data)
-                data = tf
+                data = self._spill_to_tempfile(data.encode())
+                kind = File._TEMP
+        else:
+            data = self._get_data_from_filelike_object(data)
+            kind = File._BYTES if isinstance(data, bytes) else File._TEMP
         self.data = data
+        self._kind = kind
+        self._mm = None  # lazily-created shared mmap for tempfile-backed data
+        self._decoded = None  # memoized (encoding, str) for text reads of bytes data
         self.permissions = permissions
         self.user = user
         self.user_id = user_id
         self.group = group
         self.group_id = group_id
 
+    @property
+    def path(self) -> Path:
+        return Path(self._path_str)
+
+    @staticmethod
+    def _spill_to_tempfile(payload: bytes):
+        # Single one-shot spill path shared by every too-large-for-memory case.
+        tf = NamedTemporaryFile(delete=False)
+        with tf:
+            tf.write(payload)
+        return tf
+
     def _get_data_from_filelike_object(self, data):
-        blocks = []
-        total_read = 0
-        temp: typing.Optional[NamedTemporaryFile] = None
+        if isinstance(data, (StringIO, BytesIO)):
+            # The whole payload is already in memory; getvalue() hands it over
+            # in one go (for an unmodified BytesIO, without even a copy),
+            # skipping the chunked read loop below.
+            value = data.getvalue()
+            if isinstance(value, str):
+                value = value.encode()
+            if len(value) <= File.MAX_MEM_LENGTH:
+                return value
+            return self._spill_to_tempfile(value)
+
+        # Accumulate into a single bytearray rather than a list of chunks; the
+        # in-place extend grows the buffer geometrically, so this avoids both
+        # the per-chunk bytes objects and the extra full-size copy that a final
+        # b''.join would make.
+        buf = bytearray()
+        temp: typing.Optional[typing.BinaryIO] = None
+        fd = -1  # rebound alongside temp when the buffer spills to disk
         while True:
             block = data.read(File.READ_BLOCK_SIZE)
             if len(block) == 0:
                 break
-            if isinstance(block, str):
+            is_text = isinstance(block, str)
+            if is_text:
                 block = block.encode()
 
             if temp is not None:
-                temp.write(block)
+                os.write(fd, block)
             else:
-                blocks.append(block)
-                total_read += len(block)
-                if total_read > File.MAX_MEM_LENGTH:
+                buf += block
+                if len(buf) > File.MAX_MEM_LENGTH:
+                    # Spill what has been buffered so far in one write, then
+                    # stream the rest straight to disk.  Writing on the raw fd
+                    # skips Python-level buffering on every chunk.
                     temp = NamedTemporaryFile(delete=False)
-                    for queued_block in blocks:
-                        temp.write(queued_block)
+                    fd = temp.file.fileno()
+                    os.write(fd, buf)
+                    # Text sources must stay on the decode-and-encode path:
+                    # their raw fd offset does not track the logical read
+                    # position, and the raw bytes may not be UTF-8 anyway.
+                    if not is_text and self._copy_remainder_via_sendfile(fd, data):
+                        break
         if temp:
             # Tempfile not automatically closed; close it
             temp.close()
-            data = temp
-        else:
-            data = b''.join(blocks)
-        return data
+            return temp
+        return bytes(buf)
+
+    @staticmethod
+    def _copy_remainder_via_sendfile(fd: int, source) -> bool:
+        """Copy the rest of a real, binary source file in-kernel, if possible.
+
+        Returns True if the remainder was fully copied, False if the source is
+        not a plain file (in which case the caller falls back to chunked reads).
+        """
+        try:
+            source_fd = source.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return False
+        if source.seekable():
+            # Sync the OS-level offset with the buffered read position.
+            source.seek(source.tell())
+        copied_any = False
+        try:
+            while os.sendfile(fd, source_fd, None, File.READ_BLOCK_SIZE * 16):
+                copied_any = True
+        except OSError:
+            if copied_any and source.seekable():
+                # Part of the remainder is already on disk and the kernel
+                # offset has advanced past the buffered read position.  Move
+                # the Python-level position up to the kernel's so the caller's
+                # chunked fallback resumes instead of duplicating bytes.
+                source.seek(os.lseek(source_fd, 0, os.SEEK_CUR))
+            return False
+        return True
 
     def open(
             self,
             encoding: typing.Optional[str] = 'utf-8',
     ) -> typing.Union[typing.TextIO, typing.BinaryIO]:
-        if hasattr(self.data, 'name'):  # tempfile case
-            return open(self.data.name, encoding=encoding)
+        kind = self._kind
+        if kind == File._TEMP:
+            # Map the tempfile once and serve every open() from the shared
+            # read-only mapping; repeated opens then cost only a small reader
+            # wrapper instead of an open(2) and buffered reads per call.
+            mm = self._mm
+            if mm is None:
+                fd = os.open(self.data.name, os.O_RDONLY)
+                try:
+                    mm = self._mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                finally:
+                    os.close(fd)
+            if encoding is None:
+                return io.BufferedReader(_MemReader(mm))
+            return io.TextIOWrapper(io.BufferedReader(_MemReader(mm)), encoding=encoding)
         if encoding is None:
             # binary mode; coerce string to utf-8 bytes if needed
-            return BytesIO(self.data if isinstance(self.data, bytes) else self.data.encode())
-        else:
-            # string mode; coerce bytes to string if needed.  encoding ignored if already a string.
-            return StringIO(
-                self.data if isinstance(self.data, str)
-                else self.data.decode(encoding))
+            data = self.data if kind == File._BYTES else self.data.encode()
+            return io.BufferedReader(_MemReader(data))
+        if kind == File._STR:
+            # string mode; encoding ignored if already a string.
+            return StringIO(self.data)
+        # Text read of bytes data.  The stored payload never changes, so the
+        # decoded string can be memoized; repeated opens skip the codec.
+        cached = self._decoded
+        if cached is not None and cached[0] == encoding:
+            return StringIO(cached[1])
+        text = self.data.decode(encoding)
+        self._decoded = (encoding, text)
+        return StringIO(text)
 
     def __del__(self, unlink=os.unlink) -> None:
-        if hasattr(self.data, 'name'):
-            # This is a file-like object returned from NamedTemporaryFile; remove the tempfile.
-            unlink(self.data.name)
+        if self._kind == File._TEMP:
+            if self._mm is not None:
+                try:
+                    self._mm.close()
+                except BufferError:
+                    # A reader opened from the mapping is still alive; the OS
+                    # keeps the (unlinked) file readable until it goes away.
+                    pass
+            # self.data is a file-like object returned from NamedTemporaryFile; remove the
+            # tempfile.
+            try:
+                unlink(self.data.name)
+            except OSError:
+                # Already removed, e.g. by cleanup during interpreter shutdown.
+                pass
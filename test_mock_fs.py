@@ -12,72 +12,141 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+import functools
+import hashlib
+import os
+import tempfile
 import unittest
 from io import BytesIO, StringIO
 from pathlib import Path
 
 import mock_fs
 
+try:
+    import pytest
+    _bigdata = pytest.mark.bigdata
+except ImportError:  # plain `python -m unittest` run; marker selection unused
+    def _bigdata(test):
+        return test
+
+
+@functools.lru_cache(maxsize=None)
+def _big_payload():
+    """Somewhat non-trivial large-file payload, built on first use.
+
+    (32 distinct printable ASCII characters, repeated 2**15 times, 1 MiB of
+    total data.)  Returns the data plus its length and blake2b digest; lazy so
+    runs deselecting the bigdata marker never pay for the allocation.
+    """
+    data = "ABCDEFGHIJKLMNOPQRSTUVWXYZ012345" * (2**15)
+    return data, len(data), hashlib.blake2b(data.encode(), digest_size=16).digest()
+
+
+# UTF-8 payload for the encoding round-trip tests, encoded once.
+_JP = "日本語"  # Japanese for "Japanese"
+_JP_UTF8 = _JP.encode('utf-8')
+
+# Path literals shared across tests, parsed once instead of per use.
+P_ETC = Path('/etc')
+P_INITD = Path('/etc/init.d')
+P_OPT = Path('/opt')
+P_TEST = Path('/test')
+
 
 class Tests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Build the reference filesystem once and hand each test a copy; the
+        # per-test cost is a deepcopy of the template's object graph rather
+        # than re-running whatever setup the template accumulates.  The
+        # template stays empty for now because every test below creates the
+        # exact tree it asserts against.
+        cls._template_fs = mock_fs.MockFilesystem()
+
+    def _make_fs(self) -> mock_fs.MockFilesystem:
+        # Single point of construction: a subclass exercising another backend
+        # only needs to override this hook, not duplicate the test bodies.
+        return copy.deepcopy(self._template_fs)
+
     def setUp(self):
-        self.fs = mock_fs.MockFilesystem()
+        self.fs = self._make_fs()
+
+    def assertRaisesWithArg(self, exc, arg, fn, *args, **kwargs):  # noqa: N802
+        # The suite's dominant failure assertion is "raises exc with this
+        # exact first argument"; doing it in one helper skips the
+        # _AssertRaisesContext object and context-manager bookkeeping that
+        # assertRaises sets up per call.
+        try:
+            fn(*args, **kwargs)
+        except exc as error:
+            self.assertEqual(error.args[0], arg)
+        else:
+            self.fail('{} not raised'.format(exc.__name__))
+
+    def _assert_bulk_equal(self, got, expected_len, expected_hash):
+        # Length plus a blake2b digest identifies the payload without holding
+        # a second full-size operand for the comparison, and a mismatch fails
+        # on the 16-byte digests instead of asking unittest to diff megabyte
+        # strings.
+        self.assertEqual(len(got), expected_len)
+        if isinstance(got, str):
+            got = got.encode()
+        self.assertEqual(hashlib.blake2b(got, digest_size=16).digest(), expected_hash)
 
     def test_listdir_root_on_empty_os(self):
         self.assertEqual(self.fs.list_dir('/'), [])
 
     def test_listdir_on_nonexistant_dir(self):
-        with self.assertRaises(FileNotFoundError) as cm:
-            self.fs.list_dir('/etc')
-        self.assertEqual(cm.exception.args[0], '/etc')
+        self.assertRaisesWithArg(FileNotFoundError, '/etc', self.fs.list_dir, '/etc')
 
     def test_listdir(self):
         self.fs.create_dir('/opt')
-        self.fs.create_file('/opt/file1', 'data')
-        self.fs.create_file('/opt/file2', 'data')
+        self.fs.create_files([
+            ('/opt/file1', 'data'),
+            ('/opt/file2', 'data'),
+        ])
         self.assertEqual({'/opt/file1', '/opt/file2'}, set(self.fs.list_dir('/opt')))
         # Ensure that Paths also work for listdir
-        self.assertEqual({'/opt/file1', '/opt/file2'}, set(self.fs.list_dir(Path('/opt'))))
+        self.assertEqual({'/opt/file1', '/opt/file2'}, set(self.fs.list_dir(P_OPT)))
 
     def test_listdir_on_file(self):
         self.fs.create_file('/file', 'data')
-        with self.assertRaises(NotADirectoryError) as cm:
-            self.fs.list_dir('/file')
-        self.assertEqual(cm.exception.args[0], '/file')
+        self.assertRaisesWithArg(NotADirectoryError, '/file', self.fs.list_dir, '/file')
 
     def test_makedir(self):
         d = self.fs.create_dir('/etc')
         self.assertEqual(d.name, 'etc')
-        self.assertEqual(d.path, Path('/etc'))
+        self.assertEqual(d.path, P_ETC)
         d2 = self.fs.create_dir('/etc/init.d')
         self.assertEqual(d2.name, 'init.d')
-        self.assertEqual(d2.path, Path('/etc/init.d'))
+        self.assertEqual(d2.path, P_INITD)
 
     def test_makedir_fails_if_already_exists(self):
         self.fs.create_dir('/etc')
-        with self.assertRaises(FileExistsError) as cm:
-            self.fs.create_dir('/etc')
-        self.assertEqual(cm.exception.args[0], '/etc')
+        self.assertRaisesWithArg(FileExistsError, '/etc', self.fs.create_dir, '/etc')
 
     def test_makedir_fails_if_parent_dir_doesnt_exist(self):
-        with self.assertRaises(FileNotFoundError) as cm:
-            self.fs.create_dir('/etc/init.d')
-        self.assertEqual(cm.exception.args[0], '/etc')
+        self.assertRaisesWithArg(FileNotFoundError, '/etc', self.fs.create_dir, '/etc/init.d')
 
     def test_make_and_list_directory(self):
-        self.fs.create_dir('/etc')
-        self.fs.create_dir('/var')
+        self.fs.create_dirs(['/etc', '/var'])
         self.assertEqual(set(self.fs.list_dir('/')), {'/etc', '/var'})
 
+    def test_create_dirs(self):
+        dirs = self.fs.create_dirs(['/etc', '/etc/init.d', '/var'])
+        self.assertEqual([d.name for d in dirs], ['etc', 'init.d', 'var'])
+        self.assertEqual(set(self.fs.list_dir('/')), {'/etc', '/var'})
+        self.assertEqual(self.fs.list_dir('/etc'), ['/etc/init.d'])
+
     def test_make_directory_recursively(self):
         self.fs.create_dir('/etc/init.d', make_parents=True)
         self.assertEqual(self.fs.list_dir('/'), ['/etc'])
         self.assertEqual(self.fs.list_dir('/etc'), ['/etc/init.d'])
 
     def test_makedir_path_must_start_with_slash(self):
-        with self.assertRaises(ValueError) as cm:
-            self.fs.create_dir("noslash")
-        self.assertEqual(cm.exception.args[0], "Path must start with slash")
+        self.assertRaisesWithArg(
+            ValueError, "Path must start with slash", self.fs.create_dir, "noslash")
 
     def test_create_file_from_str(self):
         self.fs.create_file('/test', "foo")
@@ -91,35 +160,86 @@ class Tests(unittest.TestCase):
 
     def test_create_file_from_files(self):
         data = "foo"
+        for label, source in [
+                ('StringIO', StringIO(data)),
+                ('BytesIO', BytesIO(data.encode()))]:
+            with self.subTest(source=label):
+                path = '/test_' + label
+                self.fs.create_file(path, source)
+                with self.fs.open(path) as infile:
+                    self.assertEqual(infile.read(), 'foo')
+
+    def test_create_files(self):
+        self.fs.create_dir('/opt')
+        self.fs.create_files([
+            ('/opt/file1', 'data'),
+            ('/opt/file2', 'data'),
+            ('/file3', 'data'),
+        ])
+        self.assertEqual({'/opt/file1', '/opt/file2'}, set(self.fs.list_dir('/opt')))
+        with self.fs.open('/file3') as infile:
+            self.assertEqual(infile.read(), 'data')
 
-        sio = StringIO(data)
-        self.fs.create_file('/test', sio)
-        with self.fs.open('/test') as infile:
-            self.assertEqual(infile.read(), 'foo')
+    def test_create_files_parent_must_exist(self):
+        self.assertRaisesWithArg(
+            FileNotFoundError, '/opt', self.fs.create_files, [('/opt/file1', 'data')])
 
-        bio = BytesIO(data.encode())
-        self.fs.create_file('/test2', bio)
-        with self.fs.open('/test2') as infile:
-            self.assertEqual(infile.read(), 'foo')
+    def _patch_spill_threshold(self, threshold):
+        original = mock_fs.File.MAX_MEM_LENGTH
+        mock_fs.File.MAX_MEM_LENGTH = threshold
+        self.addCleanup(setattr, mock_fs.File, 'MAX_MEM_LENGTH', original)
 
+    @_bigdata
     def test_create_and_read_large_file(self):
-        # Create somewhat non-trivial data
-        # (32 distinct printable ASCII characters, repeated 2**15 times,
-        # 1 MiB of total data)
-        data = "ABCDEFGHIJKLMNOPQRSTUVWXYZ012345" * (2**15)
+        # Keep even the 1 MiB payload in memory; the tempfile spill mechanism
+        # itself is covered by test_spill_to_disk with a few bytes of real I/O.
+        self._patch_spill_threshold(2**30)
+        data, length, digest = _big_payload()
+        for label, source in [
+                ('blob', data),
+                ('StringIO', StringIO(data))]:
+            with self.subTest(source=label):
+                path = '/test_' + label
+                self.fs.create_file(path, source)
+                file = self.fs[path]
+                self.assertFalse(hasattr(file.data, 'name'))  # in memory, not spilled
+                with self.fs.open(path) as infile:
+                    self._assert_bulk_equal(infile.read(), length, digest)
+
+    def test_spill_to_disk(self):
+        # A tiny threshold exercises the real spill-to-tempfile path without
+        # pushing megabytes through the disk on every suite run.
+        self._patch_spill_threshold(8)
+        data = 'spilled-to-disk-data'
 
-        # Test via blob
         self.fs.create_file('/test', data)
         file = self.fs['/test']
         self.assertTrue(hasattr(file.data, 'name'))  # not present on str/bytes
         with self.fs.open('/test') as infile:
             self.assertEqual(infile.read(), data)
 
-        # Test via file-like object
         self.fs.create_file('/test2', StringIO(data))
         file = self.fs['/test2']
         self.assertTrue(hasattr(file.data, 'name'))  # not present on str/bytes
-        with self.fs.open('/test2') as infile:
+        with self.fs.open('/test2', encoding=None) as infile:
+            self.assertEqual(infile.read(), data.encode())
+
+    def test_spill_from_text_mode_file(self):
+        # A text-mode source with a real fileno() must not take the in-kernel
+        # copy shortcut: the raw bytes are not the decoded text.  utf-16 on
+        # disk makes any raw-tail leak fail the round-trip loudly.
+        self._patch_spill_threshold(8)
+        data = 'text-mode-spill-data' * 4
+        with tempfile.NamedTemporaryFile(
+                mode='w', encoding='utf-16', suffix='.txt', delete=False) as outfile:
+            self.addCleanup(os.unlink, outfile.name)
+            outfile.write(data)
+
+        with open(outfile.name, encoding='utf-16') as source:
+            self.fs.create_file('/test', source)
+        file = self.fs['/test']
+        self.assertTrue(hasattr(file.data, 'name'))  # not present on str/bytes
+        with self.fs.open('/test') as infile:
             self.assertEqual(infile.read(), data)
 
     def test_create_and_read_with_different_encodings(self):
@@ -129,29 +249,76 @@ class Tests(unittest.TestCase):
             self.assertEqual(infile.read(), b'foo')
 
         # write bytes, read as utf-8-decoded str
-        data = "日本語"  # Japanese for "Japanese"
-        self.fs.create_file('/test2', data.encode('utf-8'))
+        self.fs.create_file('/test2', _JP_UTF8)
         with self.fs.open('/test2') as infile:                    # Implicit utf-8 read
-            self.assertEqual(infile.read(), data)
+            self.assertEqual(infile.read(), _JP)
         with self.fs.open('/test2', encoding='utf-8') as infile:  # Explicit utf-8 read
-            self.assertEqual(infile.read(), data)
+            self.assertEqual(infile.read(), _JP)
 
     def test_open_directory_fails(self):
         self.fs.create_dir('/dir1')
-        with self.assertRaises(IsADirectoryError) as cm:
-            self.fs.open('/dir1')
-        self.assertEqual(cm.exception.args[0], '/dir1')
+        self.assertRaisesWithArg(IsADirectoryError, '/dir1', self.fs.open, '/dir1')
+
+    def test_open_dir(self):
+        self.fs.create_dir('/opt')
+        d = self.fs.open_dir('/opt')
+        d.create_file('file1', 'data')
+        self.assertEqual(self.fs.list_dir('/opt'), ['/opt/file1'])
+
+        self.fs.create_file('/file', 'data')
+        self.assertRaisesWithArg(NotADirectoryError, '/file', self.fs.open_dir, '/file')
+
+    def test_dir_handle_mutations_invalidate_lookups(self):
+        # Mutations made through a Directory handle must be visible to
+        # path-based lookups immediately, even for paths resolved before.
+        self.fs.create_dir('/opt')
+        self.fs.create_file('/opt/f', 'old')
+        with self.fs.open('/opt/f') as infile:
+            self.assertEqual(infile.read(), 'old')
+        self.fs.open_dir('/opt').create_file('f', 'new')
+        with self.fs.open('/opt/f') as infile:
+            self.assertEqual(infile.read(), 'new')
+
+        self.fs.create_file('/opt/g', 'data')
+        self.assertIn('/opt/g', self.fs)
+        del self.fs['/opt']['g']
+        self.assertNotIn('/opt/g', self.fs)
+        self.assertRaisesWithArg(FileNotFoundError, '/opt/g', self.fs.__getitem__, '/opt/g')
+
+    def test_contains(self):
+        self.assertNotIn('/etc', self.fs)
+        self.fs.create_dir('/etc')
+        self.assertIn('/etc', self.fs)
+        self.assertIn(P_ETC, self.fs)
+        self.assertNotIn('/etc/hosts', self.fs)
+
+    def test_dot_segments_in_str_paths(self):
+        # PurePath drops '.' components, so str-typed paths must agree with
+        # their Path-typed equivalents.
+        self.fs.create_dir('/opt')
+        self.fs.create_file('/opt/f', 'data')
+        self.assertIn('/opt/./f', self.fs)
+        self.assertIs(self.fs['/opt/./f'], self.fs['/opt/f'])
+
+    def test_trailing_slash_in_str_paths(self):
+        # PurePath also ignores trailing slashes; '/test/' names '/test'.
+        self.fs.create_file('/test/', 'data')
+        self.assertIn('/test', self.fs)
+        del self.fs['/test/']
+        self.assertNotIn('/test', self.fs)
 
     def test_delete_file(self):
-        self.fs.create_file(Path('/test'), "foo")
-        del self.fs[Path('/test')]
-        with self.assertRaises(FileNotFoundError) as cm:
-            self.fs[Path('/test')]
+        # create_file and __delitem__ take Path objects here; everything else
+        # sticks to the cheaper plain strings.
+        self.fs.create_file(P_TEST, "foo")
+        self.assertIn('/test', self.fs)
+        del self.fs[P_TEST]
+        self.assertNotIn('/test', self.fs)
+        # The lookup exception path should agree with the membership check.
+        self.assertRaisesWithArg(FileNotFoundError, '/test', self.fs.__getitem__, '/test')
 
         # Deleting deleted files should fail as well
-        with self.assertRaises(FileNotFoundError) as cm:
-            del self.fs[Path('/test')]
-        self.assertEqual(cm.exception.args[0], '/test')
+        self.assertRaisesWithArg(FileNotFoundError, '/test', self.fs.__delitem__, '/test')
 
     def test_create_dir_with_permissions(self):
         # Permissions are simply stored if provided.  No defaults are provided.
@@ -201,14 +368,14 @@ class Tests(unittest.TestCase):
         self.fs.create_dir('/etc/init.d', make_parents=True)
 
         # By path
-        o = self.fs[Path('/etc/init.d')]
+        o = self.fs[P_INITD]
         self.assertIsInstance(o, mock_fs.Directory)
-        self.assertEqual(o.path, Path('/etc/init.d'))
+        self.assertEqual(o.path, P_INITD)
 
         # By str
         o = self.fs['/etc/init.d']
         self.assertIsInstance(o, mock_fs.Directory)
-        self.assertEqual(o.path, Path('/etc/init.d'))
+        self.assertEqual(o.path, P_INITD)
 
     def test_getattr_file_not_found(self):
         # Arguably this could be a KeyError given the dictionary-style access.